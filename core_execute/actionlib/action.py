@@ -1,8 +1,17 @@
 """Defines the BasActions abstrction for all actions."""
 
-from typing import Any, Self
+from typing import TYPE_CHECKING, Any, Self
+from types import CodeType
+from collections import OrderedDict
+import ast
+import contextlib
+import functools
+import io
+import re
+import threading
+import tokenize
 import traceback
-import sys
+import warnings
 import os
 import enum
 import core_logging as log
@@ -15,6 +24,10 @@ from core_framework.status import RELEASE_IN_PROGRESS
 
 from core_db.dbhelper import update_status, update_item
 
+if TYPE_CHECKING:
+    # jinja2 is provided through core_renderer; only needed for annotations
+    from jinja2 import Template
+
 
 ACT_LABEL = "Label"
 ACT_TYPE = "Type"
@@ -36,7 +49,60 @@ LC_HOOK_FAILED = "Failed"
 LC_HOOK_RUNNING = "Running"
 LC_HOOK_COMPLETE = "Complete"
 
-NO_DEFAULT_PROVIDED = "_!NO!DEFAULT!PROVIDED!_"
+# Sentinel for "no default provided" (compared by identity, so no value can be mistaken for it)
+_MISSING = object()
+
+TEMPLATE_CACHE_SIZE = 512
+
+STATUS_BATCH_SIZE = 25
+
+# Jinja2 boolean literals, and how "{{ <literal> }}" renders
+CONDITION_LITERALS = {
+    "True": "True",
+    "true": "True",
+    "False": "False",
+    "false": "False",
+}
+
+# Python syntax nodes allowed in a condition that is evaluated without Jinja2.  This is the
+# subset of expressions (boolean logic, comparisons, names, literals and literal lists) that both
+# languages share.
+SIMPLE_CONDITION_NODES = (
+    ast.Expression,
+    ast.BoolOp,
+    ast.And,
+    ast.Or,
+    ast.UnaryOp,
+    ast.Not,
+    ast.Compare,
+    ast.Eq,
+    ast.NotEq,
+    ast.Lt,
+    ast.LtE,
+    ast.Gt,
+    ast.GtE,
+    ast.In,
+    ast.NotIn,
+    ast.Name,
+    ast.Load,
+    ast.Constant,
+    ast.List,
+    ast.Tuple,
+)
+
+# Jinja2 literals that Python spells differently
+JINJA_LITERAL_NAMES = {"true": True, "false": False, "none": None}
+
+# Number literals as lexed by Jinja2 (jinja2.lexer.integer_re / float_re).  Python also
+# accepts forms such as "1." and ".5" that Jinja2 rejects.
+JINJA_NUMBER_RE = re.compile(
+    r"""
+    0b(_?[0-1])+ | 0o(_?[0-7])+ | 0x(_?[\da-f])+ | [1-9](_?\d)* | 0(_?0)*
+    |
+    (\d+_)*\d+ ( (\.(\d+_)*\d+)? e[+\-]?(\d+_)*\d+ | \.(\d+_)*\d+ )
+    """,
+    re.IGNORECASE | re.VERBOSE,
+)
 
 
 class StatusCode(enum.Enum):
@@ -48,6 +114,252 @@ class StatusCode(enum.Enum):
     FAILED = "failed"
 
 
+# StatusCode values, bound once for the status checks (Enum.value is an attribute lookup per access)
+_S_PENDING = StatusCode.PENDING.value
+_S_RUNNING = StatusCode.RUNNING.value
+_S_COMPLETE = StatusCode.COMPLETE.value
+_S_FAILED = StatusCode.FAILED.value
+
+
+class StatusUpdateBatcher:
+    """Buffers item status updates and sends them to the database in batches.
+
+    Updates are coalesced per item so only the latest update for a PRN is sent.
+    A coalesced update keeps the position at which the item was first queued, so
+    the updates are sent in the order the items were first queued.  In particular a
+    build's status (queued before its branch's ``released_build_prn`` pointer) is
+    always written before the pointer.
+
+    The buffer is flushed when it reaches ``max_pending`` items, and explicitly by
+    the state machine at the end of each pass (see :func:`flush_status_updates`).
+    """
+
+    def __init__(self, max_pending: int = STATUS_BATCH_SIZE):
+        self.max_pending = max_pending
+        self.__pending: OrderedDict[tuple[str, str], dict[str, Any]] = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def add_status(
+        self,
+        prn: str,
+        status: str,
+        message: str | None = None,
+        details: Any = None,
+    ):
+        """
+        Queue a status update for the item.  Replaces any pending status update for the same item.
+
+        Args:
+            prn (str): The PRN of the item
+            status (str): The new status
+            message (str | None): The status message
+            details (Any): Additional status details
+        """
+        kwargs: dict[str, Any] = {"prn": prn, "status": status}
+        if message is not None:
+            kwargs["message"] = message
+        if details is not None:
+            kwargs["details"] = details
+        self.__add("status", kwargs)
+
+    def add_item(self, prn: str, **kwargs):
+        """
+        Queue an attribute update for the item.  Merges with any pending update for the same item.
+
+        Args:
+            prn (str): The PRN of the item
+            **kwargs: The item attributes to update
+        """
+        self.__add("item", {"prn": prn, **kwargs})
+
+    def flush(self):
+        """Send all pending updates to the database, in the order they were first queued."""
+        with self.__lock:
+            pending = list(self.__pending.items())
+            self.__pending.clear()
+
+        for (kind, prn), kwargs in pending:
+            try:
+                if kind == "status":
+                    update_status(**kwargs)
+                else:
+                    update_item(**kwargs)
+            except Exception as e:
+                log.warn("Failed to update status of {} via API - {}", prn, e)
+
+    def __add(self, kind: str, kwargs: dict[str, Any]):
+        key = (kind, kwargs["prn"])
+        with self.__lock:
+            if kind == "item" and key in self.__pending:
+                kwargs = {**self.__pending[key], **kwargs}
+            # Replacing an existing key keeps its original position
+            self.__pending[key] = kwargs
+            full = len(self.__pending) >= self.max_pending
+
+        if full:
+            self.flush()
+
+
+status_updates = StatusUpdateBatcher()
+"""StatusUpdateBatcher: Pending item status updates for all actions."""
+
+
+def flush_status_updates():
+    """Send all pending item status updates queued by action lifecycle hooks."""
+    status_updates.flush()
+
+
+@contextlib.contextmanager
+def log_identity(identity: str):
+    """
+    Temporarily set the logger identity, resetting it to the base value on exit.
+
+    Args:
+        identity (str): The logger identity to use within the block
+    """
+    log.set_identity(identity)
+    try:
+        yield
+    finally:
+        log.reset_identity()
+
+
+def compile_condition(condition: str) -> tuple[CodeType, frozenset[str]] | None:
+    """
+    Compile an action condition to Python bytecode if it only uses expressions that
+    Python and Jinja2 evaluate the same way.
+
+    Args:
+        condition (str): The action condition (without the ``{{ }}`` delimiters)
+
+    Returns:
+        tuple[CodeType, frozenset[str]] | None: The compiled condition and the context names
+            it reads, or None if the condition must be rendered by Jinja2
+    """
+    source = condition.strip()
+
+    # Anything that fails to parse or compile here (including conditions nested too deeply)
+    # is left to Jinja2, which reports the error when the action is executed.
+    try:
+        # Python-only lexical syntax that Jinja2 rejects: comments, string prefixes (r'', u'')
+        # and number literals Jinja2 doesn't lex (1., .5)
+        for token in tokenize.generate_tokens(io.StringIO(source).readline):
+            if token.type == tokenize.COMMENT:
+                return None
+            if token.type == tokenize.STRING and token.string[0] not in "'\"":
+                return None
+            if token.type == tokenize.NUMBER and not JINJA_NUMBER_RE.fullmatch(
+                token.string
+            ):
+                return None
+
+        # Python warns about invalid string escapes (e.g. '\d') that Jinja2 accepts
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", SyntaxWarning)
+
+            tree = ast.parse(source, mode="eval")
+
+            names = set()
+            for node in ast.walk(tree):
+                if not isinstance(node, SIMPLE_CONDITION_NODES):
+                    return None
+                if isinstance(node, ast.Constant) and not isinstance(
+                    node.value, (str, int, float, type(None))
+                ):
+                    return None
+                if isinstance(node, ast.Name) and node.id not in JINJA_LITERAL_NAMES:
+                    names.add(node.id)
+
+            return compile(tree, "<condition>", "eval"), frozenset(names)
+
+    except (
+        SyntaxError,
+        ValueError,
+        RecursionError,
+        MemoryError,
+        tokenize.TokenError,
+    ):
+        return None
+
+
+class CachingJinja2Renderer(Jinja2Renderer):
+    """Jinja2Renderer that compiles each template source string only once.
+
+    Jinja2 does not cache ``Environment.from_string`` compilations, so every
+    ``render_string`` call would otherwise lex, parse and generate code for the
+    template again.  Compiled templates are kept in an LRU cache keyed on the
+    template source, and strings without any Jinja2 markup are returned as-is.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.__compile = functools.lru_cache(maxsize=TEMPLATE_CACHE_SIZE)(
+            self.env.from_string
+        )
+        self.__markers = (
+            self.env.variable_start_string,
+            self.env.block_start_string,
+            self.env.comment_start_string,
+        )
+        # Line statements/comments can't be detected by the markers alone
+        self.__plain_allowed = (
+            self.env.line_statement_prefix is None
+            and self.env.line_comment_prefix is None
+        )
+
+    def is_plain(self, template: str) -> bool:
+        """
+        Check if the template source renders to itself, so Jinja2 can be skipped.
+
+        Jinja2 strips a single trailing newline and normalises line endings, so
+        strings with those are still rendered.
+
+        Args:
+            template (str): The template source
+
+        Returns:
+            bool: True if the template contains no Jinja2 markup
+        """
+        return (
+            self.__plain_allowed
+            and isinstance(template, str)
+            and not any(marker in template for marker in self.__markers)
+            and "\r" not in template
+            and not template.endswith("\n")
+        )
+
+    def from_string(self, template: str) -> "Template":
+        """
+        Return the compiled template for the given template source.
+
+        Args:
+            template (str): The template source
+
+        Returns:
+            Template: The compiled (and cached) Jinja2 template
+        """
+        return self.__compile(template)
+
+    def render_string(self, template: str, context: dict[str, Any]) -> str:
+        """
+        Render the template source with the given context.
+
+        Args:
+            template (str): The template source
+            context (dict[str, Any]): The rendering context
+
+        Returns:
+            str: The rendered template
+        """
+        if not isinstance(template, str):
+            return super().render_string(template, context)
+        if self.is_plain(template):
+            return template
+        # self.env is the Environment the parent renders with, so rendering the
+        # cached env.from_string template gives the same result as the parent
+        return self.from_string(template).render(context)
+
+
 class BaseAction:
     """BaseActions the class where all actions inherit from."""
 
@@ -71,8 +383,11 @@ class BaseAction:
     condition: str
     """str: The condition of the action."""
 
-    after: list[str]
-    """list[str]: The actions that should be perfomed after this action."""
+    after: tuple[str, ...]
+    """tuple[str, ...]: The actions that should be perfomed after this action."""
+
+    _after_set: frozenset[str]
+    """frozenset[str]: The ``after`` labels, for constant time membership tests."""
 
     params: ActionParams
     """ActionParams: The parameters of the action."""
@@ -80,11 +395,14 @@ class BaseAction:
     lifecycle_hooks: list[dict[str, Any]]
     """list[dict[str, Any]]: The lifecycle hooks of the action."""
 
+    _hooks_by_event: dict[str, list[tuple[dict[str, Any], dict[str, Any]]]]
+    """dict[str, list[tuple[dict, dict]]]: Lifecycle hooks indexed by event, paired with their ``On<event>`` parameters."""
+
     deployment_details: DeploymentDetails
     """DeploymentDetails: The deployment details of the action. client/portfolio/app/branch/build information."""
 
-    renderer: Jinja2Renderer
-    """Jinja2Renderer: The Jinja2 Renderer for the action.  Uses the context to render templates."""
+    renderer: CachingJinja2Renderer = CachingJinja2Renderer()
+    """CachingJinja2Renderer: The Jinja2 Renderer shared by all actions (and their template cache).  Uses the context to render templates."""
 
     def _execute(self):
         raise NotImplementedError("Must implement in subclass")
@@ -110,9 +428,6 @@ class BaseAction:
 
         log.trace("BaseAction.__init__()")
 
-        # All actions can use the Jinja2 renderer to parse CloudFormation.j2 templates
-        self.renderer = Jinja2Renderer()
-
         # Extract action details from the definition
         self.label = definition.Label
 
@@ -124,35 +439,77 @@ class BaseAction:
 
         self.deployment_details = deployment_details
 
-        self.action_name = self.label.split("/", 1)[-1]
+        # Split the label into "<prn>/<action name>" once
+        prn, sep, name = self.label.partition("/")
+
+        self.action_name = name if sep else self.label
 
         # Set output_namespace if user specified SaveOutputs = True
         if definition.SaveOutputs:
-            self.output_namespace = self.label.split("/", 1)[0].replace(
-                ":action", ":output"
-            )
+            self.output_namespace = prn.replace(":action", ":output")
         else:
             self.output_namespace = None
 
         log.debug("Action output namespace is {}", self.output_namespace)
 
         # State namespace is the same as action label, except with :var/ instead of :action/
-        self.state_namespace = self.label.replace(":action/", ":var/")
+        self.state_namespace = self.label.replace(":action/", ":var/", 1)
 
         log.debug("Action state namespace is {}", self.state_namespace)
 
+        # Context keys are "<namespace>/<name>".  Build the prefixes once instead of on every access.
+        self._status_code_key = f"{self.label}/{STATUS_CODE}"
+        self._status_reason_key = f"{self.label}/{STATUS_REASON}"
+        self._state_prefix = f"{self.state_namespace}/"
+        self._output_prefix = (
+            f"{self.output_namespace}/" if self.output_namespace is not None else None
+        )
+
         after = definition.After or []
         depends = definition.DependsOn or []
 
         self.type = definition.Type
         self.condition = definition.Condition or "True"
+        self._condition_src = "{{ " + self.condition + " }}"
+
+        # Literal conditions (the default is "True") don't need to be rendered
+        self._condition_const = CONDITION_LITERALS.get(str(self.condition).strip())
+
+        # Simple conditions are evaluated as Python expressions rather than rendered
+        self._condition_code = compile_condition(str(self.condition))
+
         self.before = definition.Before or []
-        self.after = after + depends
+        self.after = tuple(after) + tuple(depends)
+        self._after_set = frozenset(self.after)
         self.params = definition.Params
         self.lifecycle_hooks = definition.LifecycleHooks or []
 
+        # Index the lifecycle hooks by event so state changes don't rescan every hook
+        self._hooks_by_event = {}
+        for hook in self.lifecycle_hooks:
+            parms = hook.get("Parameters", {})
+            # A hook runs once per event even if its States list an event twice
+            for event in dict.fromkeys(hook.get("States", [])):
+                self._hooks_by_event.setdefault(event, []).append(
+                    (hook, parms.get(f"On{event}") or {})
+                )
+
         log.trace("BaseAction.__init__() - complete")
 
+    def depends_on(self, label: str) -> bool:
+        """
+        Check if the action explicitly depends on the given action label (After or DependsOn).
+
+        Wildcard dependencies are not expanded.  See :class:`Helper` for wildcard matching.
+
+        Args:
+            label (str): The label of the other action
+
+        Returns:
+            bool: True if the label is one of this action's dependencies
+        """
+        return label in self._after_set
+
     def is_init(self) -> bool:
         """
         Check if the action is in the init state.
@@ -160,7 +517,7 @@ class BaseAction:
         Returns:
             bool: True if the action is in the init state
         """
-        return self.__get_status_code() == StatusCode.PENDING.value
+        return self.__get_status_code() == _S_PENDING
 
     def is_failed(self) -> bool:
         """
@@ -169,7 +526,7 @@ class BaseAction:
         Returns:
             bool: True if the action is in the failed state
         """
-        return self.__get_status_code() == StatusCode.FAILED.value
+        return self.__get_status_code() == _S_FAILED
 
     def is_running(self) -> bool:
         """
@@ -178,7 +535,7 @@ class BaseAction:
         Returns:
             bool: True if the action is in the running state
         """
-        return self.__get_status_code() == StatusCode.RUNNING.value
+        return self.__get_status_code() == _S_RUNNING
 
     def is_complete(self) -> bool:
         """
@@ -187,7 +544,7 @@ class BaseAction:
         Returns:
             bool: True if the action is in the complete state
         """
-        return self.__get_status_code() == StatusCode.COMPLETE.value
+        return self.__get_status_code() == _S_COMPLETE
 
     def set_failed(self, reason: str):
         """
@@ -196,24 +553,9 @@ class BaseAction:
         Args:
             reason (str): Reason the status failed.
         """
-        log.trace("Setting action to failed - {}", reason)
-
-        # Ignore duplicate state updates
-        if self.is_failed() and self.__get_status_reason() == reason:
-            log.trace("Action is already failed - {}", reason)
-            return
-
-        # Log the state change
-        log.debug("Action has failed - {}", reason)
-
-        # Execute lifecycle hooks
-        self.__execute_lifecycle_hooks(LC_HOOK_FAILED, reason)
-
-        # Update the context with the new state
-        self.__set_context(self.label, STATUS_CODE, StatusCode.FAILED.value)
-        self.__set_context(self.label, STATUS_REASON, reason)
-
-        log.trace("Action set to failed - {}", reason)
+        self._transition(
+            _S_FAILED, reason, LC_HOOK_FAILED, "failed", "Action has failed - {}"
+        )
 
     def set_running(self, reason: str):
         """
@@ -222,24 +564,7 @@ class BaseAction:
         Args:
             reason (str): The reason the status is running.
         """
-        log.trace("Setting action to running - {}", reason)
-
-        # Ignore duplicate state updates
-        if self.is_running() and self.__get_status_reason() == reason:
-            log.trace("Action is already running - {}", reason)
-            return
-
-        # Log the state change
-        log.debug(reason or "Action is running")
-
-        # Execute lifecycle hooks
-        self.__execute_lifecycle_hooks(LC_HOOK_RUNNING, reason)
-
-        # Update the context with the new state
-        self.__set_context(self.label, STATUS_CODE, StatusCode.RUNNING.value)
-        self.__set_context(self.label, STATUS_REASON, reason)
-
-        log.trace("Action set to running - {}", reason)
+        self._transition(_S_RUNNING, reason, LC_HOOK_RUNNING, "running")
 
     def set_complete(self, reason: str):
         """
@@ -248,47 +573,82 @@ class BaseAction:
         Args:
             reason (str): The reason the status is complete.
         """
-        log.trace("Setting action to complete - {}", reason)
+        self._transition(
+            _S_COMPLETE,
+            reason,
+            LC_HOOK_COMPLETE,
+            "complete",
+            "Action is complete - {}",
+        )
 
-        # Ignore duplicate state updates
-        if self.is_complete() and self.__get_status_reason() == reason:
-            log.trace("Action is already complete - {}", reason)
-            return
+    def set_skipped(self, reason: str):
+        """
+        Set the status to skipped and supply the given reason
 
-        # Log the state change
-        log.debug("Action is complete - {}", reason)
+        A skipped action is complete, but its lifecycle hooks are not executed.
 
-        # Execute lifecycle hooks
-        self.__execute_lifecycle_hooks(LC_HOOK_COMPLETE, reason)
+        Args:
+            reason (str): The reason the status is skipped.
+        """
+        self._transition(
+            _S_COMPLETE, reason, None, "skipped", "Action has been skipped - {}"
+        )
 
-        # Update the context with the new state
-        self.__set_context(self.label, STATUS_CODE, StatusCode.COMPLETE.value)
-        self.__set_context(self.label, STATUS_REASON, reason)
+    def _current(self) -> tuple[str, str | None]:
+        """
+        Get the current status of the action.
 
-        log.trace("Action set to complete - {}", reason)
+        Returns:
+            tuple[str, str | None]: The status code and status reason
+        """
+        context = self.context or {}
+        return (
+            context.get(self._status_code_key, _S_PENDING),
+            context.get(self._status_reason_key),
+        )
 
-    def set_skipped(self, reason: str):
+    def _transition(
+        self,
+        code: str,
+        reason: str,
+        hook: str | None,
+        state: str,
+        message: str | None = None,
+    ):
         """
-        Set the status to skipped and supply the given reason
+        Change the status of the action, executing the lifecycle hooks for the event.
 
         Args:
-            reason (str): The reason the status is skipped.
+            code (str): The new status code
+            reason (str): The reason for the status change
+            hook (str | None): The lifecycle hook event to execute, or None to skip the hooks
+            state (str): The name of the new state used in trace logs (e.g. "skipped")
+            message (str | None): The state change log message, formatted with the reason.
+                If None, the reason itself is logged (or "Action is <state>" if there is none)
         """
-        log.trace("Setting action to skipped - {}", reason)
+        log.trace("Setting action to {} - {}", state, reason)
 
         # Ignore duplicate state updates
-        if self.is_complete() and self.__get_status_reason() == reason:
-            log.trace("Action is already complete - {}", reason)
+        current_code, current_reason = self._current()
+        if current_code == code and current_reason == reason:
+            log.trace("Action is already {} - {}", code, reason)
             return
 
         # Log the state change
-        log.debug("Action has been skipped - {}", reason)
+        if message is None:
+            log.debug(reason or f"Action is {state}")
+        else:
+            log.debug(message, reason)
+
+        # Execute lifecycle hooks
+        if hook is not None:
+            self.__execute_lifecycle_hooks(hook, reason)
 
         # Update the context with the new state
-        self.__set_context(self.label, STATUS_CODE, StatusCode.COMPLETE.value)
-        self.__set_context(self.label, STATUS_REASON, reason)
+        self.__set_context(self._status_code_key, code)
+        self.__set_context(self._status_reason_key, reason)
 
-        log.trace("Action set to skipped - {}", reason)
+        log.trace("Action set to {} - {}", state, reason)
 
     def set_output(self, name: str, value: Any):
         """
@@ -301,16 +661,27 @@ class BaseAction:
         log.trace("Setting output '{}' = '{}'", name, value)
 
         # Set output variable (if user chose to save outputs)
-        if self.output_namespace is not None:
-            log.debug(
-                "Setting output '{}/{}' = '{}'", self.output_namespace, name, value
-            )
-            self.__set_context(self.output_namespace, name, value)
+        if self._output_prefix is not None:
+            self.__set_context(self._output_prefix + name, value)
 
         # Set state variable
-        self.__set_context(self.state_namespace, name, value)
+        self.__set_context(self._state_prefix + name, value)
+
+    def set_outputs(self, values: dict[str, Any]):
+        """
+        Set several outputs of the action at once.  Equivalent to calling :meth:`set_output` for each item.
 
-        log.trace("Output '{}' set to '{}'", name, value)
+        Args:
+            values (dict[str, Any]): Output variable names and values
+        """
+        log.debug("Setting outputs {}", list(values))
+
+        # Set output variables (if user chose to save outputs)
+        if self._output_prefix is not None:
+            self.__update_context(self._output_prefix, values)
+
+        # Set state variables
+        self.__update_context(self._state_prefix, values)
 
     def get_output(self, name: str) -> str | None:
         """
@@ -325,9 +696,9 @@ class BaseAction:
 
         log.trace("Getting output '{}'", name)
 
-        if self.output_namespace is None:
+        if self._output_prefix is None:
             return None
-        return self.__get_context(self.output_namespace, name)
+        return self.__get_context(self._output_prefix + name)
 
     def set_state(self, name: str, value: Any):
         """
@@ -339,14 +710,16 @@ class BaseAction:
         """
         log.trace("Setting state '{}' = '{}'", name, value)
 
-        self.__set_context(self.state_namespace, name, value)
+        self.__set_context(self._state_prefix + name, value)
 
-    def get_state(self, name: str) -> str:
+    def get_state(self, name: str, default: Any = _MISSING) -> str:
         """
         Get a state variable of the action within the action state namespace
 
         Args:
             name (str): Name of the state variable
+            default (Any, optional): Value returned if the state variable has not been set.
+                If not provided, a KeyError is raised instead.
 
         Returns:
             str: Value of the state variable
@@ -354,7 +727,7 @@ class BaseAction:
 
         log.trace("Getting state '{}'", name)
 
-        return self.__get_context(self.state_namespace, name)
+        return self.__get_context(self._state_prefix + name, default)
 
     def execute(self) -> Self:
         """
@@ -366,56 +739,27 @@ class BaseAction:
             Self: This action object
         """
 
-        try:
-            # Temporarily set the logger identity to this action's label
-            log.set_identity(self.label)
+        # Temporarily set the logger identity to this action's label
+        with log_identity(self.label):
+            try:
+                log.trace("Executing action for {}", self.label)
 
-            log.trace("Executing action for {}", self.label)
+                # Render the action condition, and see if it evaluates to true
+                condition_result = self.__evaluate_condition()
 
-            # Render the action condition, and see if it evaluates to true
-            condition_result = self.renderer.render_string(
-                "{{ " + self.condition + " }}", self.context
-            )
+                if condition_result.lower() == "true":
+                    # Condition is true, execute the action
+                    self._resolve()
+                    self._execute()
+                else:
+                    # Condition is false, skip the action
+                    self.set_skipped(f"Condition evaluated to '{condition_result}'")
 
-            if condition_result.lower() == "true":
-                # Condition is true, execute the action
-                self._resolve()
-                self._execute()
-            else:
-                # Condition is false, skip the action
-                self.set_skipped("Condition evaluated to '{}'".format(condition_result))
-
-            log.trace("Action executed for {}", self.label)
-
-        except Exception as e:
-            # Something went wrong (internal error)
-            exc_type, exc_obj, exc_tb = sys.exc_info()
-            if exc_type is None:
-                exc_type = type(e)
-            if exc_tb and exc_tb.tb_frame:
-                fname = os.path.split(exc_tb.tb_frame.f_code.co_filename)[1]
-                lineno = exc_tb.tb_lineno
-            else:
-                fname = "Unknown"
-                lineno = -1
-            tb_str = "".join(traceback.format_exception(exc_type, exc_obj, exc_tb))
-            self.set_failed(
-                "Internal error {} in {} at {} - {}\nTraceback:\n{}".format(
-                    exc_type.__name__, fname, lineno, str(e), tb_str
-                )
-            )
-            log.error(
-                "Internal error {} in {} at {} - {}",
-                exc_type.__name__,
-                fname,
-                lineno,
-                str(e),
-            )
+                log.trace("Action executed for {}", self.label)
 
-        finally:
-            # Reset the logger identity to base value
-            log.trace("Resetting identity")
-            log.reset_identity()
+            except Exception as e:
+                # Something went wrong (internal error)
+                self._record_failure(e)
 
         return self
 
@@ -427,115 +771,132 @@ class BaseAction:
             Self: _description_
         """
 
-        try:
-            # Temporarily set the logger identity to this action's label
-            log.set_identity(self.label)
+        # Temporarily set the logger identity to this action's label
+        with log_identity(self.label):
+            try:
+                log.debug("Checking action for {}", self.label)
 
-            log.debug("Checking action for {}", self.label)
+                self._resolve()
+                self._check()
 
-            self._resolve()
-            self._check()
+                log.trace("Action checked for {}", self.label)
 
-            log.trace("Action checked for {}", self.label)
+            except Exception as e:
+                # Something went wrong (internal error)
+                self._record_failure(e)
 
-        except Exception as e:
-            # Something went wrong (internal error)
-            exc_type, exc_obj, exc_tb = sys.exc_info()
-            if exc_type is None:
-                exc_type = type(e)
-            if exc_tb and exc_tb.tb_frame:
-                fname = os.path.split(exc_tb.tb_frame.f_code.co_filename)[1]
-                lineno = exc_tb.tb_lineno
-            else:
-                fname = "Unknown"
-                lineno = -1
-            tb_str = "".join(traceback.format_exception(exc_type, exc_obj, exc_tb))
-            self.set_failed(
-                "Internal error {} in {} at {} - {}\nTraceback:\n{}".format(
-                    exc_type.__name__, fname, lineno, str(e), tb_str
-                )
-            )
-            log.error(
-                "Internal error {} in {} at {} - {}",
-                exc_type.__name__,
-                fname,
-                lineno,
-                str(e),
-            )
+        return self
 
-        finally:
-            # Reset the logger identity to base value
-            log.reset_identity()
+    def __evaluate_condition(self) -> str:
+
+        # Literal True / False
+        if self._condition_const is not None:
+            return self._condition_const
+
+        # Simple expression, if every name it reads is in the context and it yields a bool
+        if self._condition_code is not None:
+            code, names = self._condition_code
+            context = self.context or {}
+            if names.issubset(context.keys()):
+                namespace = {name: context[name] for name in names}
+                namespace.update(JINJA_LITERAL_NAMES)
+                try:
+                    result = eval(code, {"__builtins__": {}}, namespace)
+                except Exception:
+                    result = None
+                if isinstance(result, bool):
+                    return str(result)
+
+        # Anything else is rendered by Jinja2 (which also reports any errors)
+        return self.renderer.render_string(self._condition_src, self.context)
+
+    def _record_failure(self, e: Exception):
+        """
+        Set the action to failed because of an internal error raised while executing or checking it.
 
-        return self
+        Args:
+            e (Exception): The exception that was raised
+        """
+        exc_tb = e.__traceback__
+        if exc_tb and exc_tb.tb_frame:
+            fname = os.path.split(exc_tb.tb_frame.f_code.co_filename)[1]
+            lineno = exc_tb.tb_lineno
+        else:
+            fname = "Unknown"
+            lineno = -1
+
+        # The traceback is only formatted on failure.  It is kept in the status reason for diagnosis.
+        tb_str = "".join(traceback.format_exception(e))
+        self.set_failed(
+            "Internal error {} in {} at {} - {}\nTraceback:\n{}".format(
+                type(e).__name__, fname, lineno, str(e), tb_str
+            )
+        )
+        log.error(
+            "Internal error {} in {} at {} - {}",
+            type(e).__name__,
+            fname,
+            lineno,
+            str(e),
+        )
 
     def __get_status_code(self):
-        return self.__get_context(self.label, STATUS_CODE, StatusCode.PENDING.value)
+        return self.__get_context(self._status_code_key, _S_PENDING)
 
-    def __get_status_reason(self):
-        return self.__get_context(self.label, STATUS_REASON, None)
+    def __get_context(self, key: str, default: Any = _MISSING) -> Any:
+        # Single lookup; the context is the shared "<namespace>/<name>" state dictionary
+        value = self.context.get(key, default) if self.context else default
 
-    def __get_context(
-        self, prn: str, name: str, default: str = NO_DEFAULT_PROVIDED
-    ) -> str:
-        key = "{}/{}".format(prn, name)
+        if value is _MISSING:
+            raise KeyError(
+                "Key '{}' is not in the context and no default was provided".format(
+                    key.rsplit("/", 1)[-1]
+                )
+            )
 
-        if self.context and key in self.context:
-            return self.context[key]
+        return value
 
-        else:
-            if default == NO_DEFAULT_PROVIDED:
-                raise KeyError(
-                    "Key '{}' is not in the context and no default was provided".format(
-                        name
-                    )
-                )
-            else:
-                return default
+    def __set_context(self, key: str, value: Any):
 
-    def __set_context(self, prn: str, name: str, value: Any):
+        # Mutate in place: the context is shared by every action and saved as the state
+        if self.context is None:
+            self.context = {}
 
-        key = "{}/{}".format(prn, name)
+        self.context[key] = value
 
-        if not self.context:
-            self.context = {key: value}
-        else:
-            self.context[key] = value
+    def __update_context(self, prefix: str, values: dict[str, Any]):
 
-    def __execute_lifecycle_hooks(self, event: str, reason: str):
-        # Retrieve the event hooks for this action, for this state event
-        event_hooks = [h for h in self.lifecycle_hooks if event in h.get("States", [])]
+        if self.context is None:
+            self.context = {}
 
-        # Execute the event hooks
-        for event_hook in event_hooks:
+        self.context.update({prefix + name: value for name, value in values.items()})
+
+    def __execute_lifecycle_hooks(self, event: str, reason: str):
+        # Execute the event hooks for this action, for this state event
+        for event_hook, event_parms in self._hooks_by_event.get(event, []):
             hook_type = event_hook["Type"]
-            self.__execute_lifecycle_hook(event, hook_type, event_hook, reason)
+            self.__execute_lifecycle_hook(
+                event, hook_type, event_hook, event_parms, reason
+            )
 
     def __execute_lifecycle_hook(
-        self, event: str, hook_type: str, hook: dict[str, Any], reason: str
+        self,
+        event: str,
+        hook_type: str,
+        hook: dict[str, Any],
+        event_parms: dict[str, Any],
+        reason: str,
     ):
         if hook_type == LC_TYPE_STATUS:
-            self.__execute_status_hook(event, hook, reason)
+            self.__execute_status_hook(event, hook, event_parms, reason)
         else:
             raise Exception("Unsupported hook type {}".format(hook_type))
 
-    def __get_status_parameter(self, event: str, hook: dict[str, Any]) -> str | None:
-        key = f"On{event}"
-        parms = hook.get("Parameters", {})
-        if key in parms:
-            action = parms[key]
-            if "Status" in action:
-                return action["Status"]
-        return None
+    def __get_status_parameter(self, event_parms: dict[str, Any]) -> str | None:
+        return event_parms.get("Status")
 
-    def __get_message_parameter(self, event, hook: dict[str, Any]) -> str | None:
-        key = f"On{event}"
-        parms = hook.get("Parameters", {})
-        if key in parms:
-            action = parms[key]
-            if "Message" in action:
-                return action["Message"]
-        return None
+    def __get_message_parameter(self, event_parms: dict[str, Any]) -> str | None:
+        return event_parms.get("Message")
 
     def __get_idenity_parameter(self, event: str, hook: dict[str, Any]) -> str | None:
         parms = hook.get("Parameters", hook)
@@ -553,9 +914,6 @@ class BaseAction:
         self, identity: str, status: str, message: str, details: Any
     ):
         try:
-            # Log the status
-            log.set_identity(identity)
-
             prn_sections = identity.split(":")
 
             # Build PRN
@@ -563,44 +921,41 @@ class BaseAction:
                 build_prn = ":".join(prn_sections[0:5])
 
                 # Update the build status
-                update_status(
-                    prn=build_prn, status=status, message=message, details=details
-                )
+                status_updates.add_status(build_prn, status, message, details)
 
                 # If a new build is being released, update the branch's released_build_prn pointer
                 if status == RELEASE_IN_PROGRESS:
                     branch_prn = ":".join(prn_sections[0:4])
-                    update_item(prn=branch_prn, released_build_prn=build_prn)
+                    status_updates.add_item(branch_prn, released_build_prn=build_prn)
 
             # Component PRN
             if len(prn_sections) == 6:
                 component_prn = ":".join(prn_sections[0:6])
 
                 # Update the component status
-                update_status(
-                    prn=component_prn, status=status, message=message, details=details
-                )
+                status_updates.add_status(component_prn, status, message, details)
 
                 # If component has failed, update the build status to failed
                 if "_FAILED" in status:
                     build_prn = ":".join(prn_sections[0:5])
 
                     # Update the build status
-                    update_status(prn=build_prn, status=status)
+                    status_updates.add_status(build_prn, status)
 
         except Exception as e:
-            log.warn("Failed to update status via API - {}", e)
-
-        finally:
-            log.reset_identity()
+            log.warn("Failed to queue status update for {} - {}", identity, e)
 
     def __execute_status_hook(
-        self, event: str, hook: dict[str, Any], reason: str | None
+        self,
+        event: str,
+        hook: dict[str, Any],
+        event_parms: dict[str, Any],
+        reason: str | None,
     ):
 
         # Extract hook["Parameter"]["On<event>"]["Status"], then try hook["Status"]
-        status = self.__get_status_parameter(event, hook)
-        message = self.__get_message_parameter(event, hook)
+        status = self.__get_status_parameter(event_parms)
+        message = self.__get_message_parameter(event_parms)
         identity = self.__get_idenity_parameter(event, hook)
         details = self.__get_details_parameter(event, hook)
 
@@ -640,7 +995,7 @@ class BaseAction:
         self.__update_item_status(identity, status, message, details)
 
     def __repr__(self):
-        return "{}({})".format(type(self).__name__, self.label)
+        return f"{type(self).__name__}({self.label})"
 
     def __str__(self):
-        return "{}({})".format(type(self).__name__, self.label)
+        return f"{type(self).__name__}({self.label})"
@@ -1,6 +1,9 @@
 """Duplicate an Image and copy it to one ore more accounts"""
 
 from typing import Any
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
 
 import core_logging as log
 
@@ -13,6 +16,15 @@ from core_execute.actionlib.action import BaseAction, ActionParams
 
 import boto3
 
+# Seconds before the assumed role credentials expire that a cached session is replaced
+SESSION_EXPIRY_MARGIN = 60
+
+# Lifetime assumed when the credentials do not report an expiration (the minimum STS duration)
+SESSION_DEFAULT_LIFETIME = 900
+
+_SESSION_CACHE: dict[tuple[str, str], tuple[float, boto3.Session]] = {}
+_SESSION_CACHE_LOCK = threading.Lock()
+
 
 def generate_template() -> ActionDefinition:
     """Generate the action definition"""
@@ -38,7 +50,8 @@ def generate_template() -> ActionDefinition:
 class DuplicateImageToAccountAction(BaseAction):
     """Duplicate an Image and copy it to one ore more accounts
 
-    This action will duplicate an image and copy it to one or more accounts.  The action will wait for the copy to complete before returning.
+    This action will duplicate an image and copy it to one or more accounts.  The snapshot copies run concurrently
+    and the action remains running until the image is available in every account.
 
     Attributes:
         Type: Use the value: ``AWS::DuplicateImageToAccount``
@@ -82,6 +95,12 @@ class DuplicateImageToAccountAction(BaseAction):
         if deployment_details.DeliveredBy:
             self.params.Tags["DeliveredBy"] = deployment_details.DeliveredBy
 
+        # Tags are fixed once the action is created, so transform them only once
+        self.__tags = aws.transform_tag_hash(self.params.Tags)
+
+        # Provisioning role ARNs by account, looked up on first use
+        self.__role_arns: dict[str, str] = {}
+
     def _execute(self):
 
         log.trace("DuplicateImageToAccountAction._execute()")
@@ -94,7 +113,7 @@ class DuplicateImageToAccountAction(BaseAction):
         # Obtain an EC2 client
         ec2_client = aws.ec2_client(
             region=self.params.Region,
-            role=util.get_provisioning_role_arn(self.params.Account),
+            role=self.__get_role_arn(self.params.Account),
         )
 
         # Find image (provides image id and snapshot ids)
@@ -126,50 +145,206 @@ class DuplicateImageToAccountAction(BaseAction):
 
         snapshot_id = snapshot_ids[0]
 
-        # Share snapshot with the target account
-        target_account = self.params.AccountsToShare[0]
+        # Share snapshot with all of the target accounts
+        target_accounts = self.params.AccountsToShare
         self.set_running(
-            "Sharing snapshot with the target account {}".format(target_account)
-        )
-        log.debug(
-            "Account {} is getting the image shared, starting now!", target_account
+            "Sharing snapshot with the target accounts {}".format(
+                ", ".join(target_accounts)
+            )
         )
-        response = ec2_client.modify_snapshot_attribute(
+        ec2_client.modify_snapshot_attribute(
             Attribute="createVolumePermission",
             OperationType="add",
             SnapshotId=snapshot_id,
-            UserIds=[
-                target_account,
-            ],
+            UserIds=target_accounts,
+        )
+        log.debug(
+            "Successfully shared snapshot with target accounts {}", target_accounts
         )
-        log.debug("Successfully shared snapshot with target account {}", target_account)
-
-        # Set Target account Instance object
-        target_ec2_session = self.__ec2_session()
-        target_ec2 = target_ec2_session.resource("ec2")
-        log.debug("Successfully set target ec2 instance object")
 
-        # Create a copy of the shared snapshot on the target account
+        # Create a copy of the shared snapshot in each target account.  The copies run
+        # concurrently, and _check() waits for them to complete.
         self.set_running(
-            "Copying snapshot with the target account {}".format(target_account)
+            "Copying snapshot to the target accounts {}".format(
+                ", ".join(target_accounts)
+            )
         )
 
-        shared_snapshot = target_ec2.Snapshot(snapshot_id)
-        copy = shared_snapshot.copy(
-            SourceRegion=self.params.Region,
-            Encrypted=True,
-            KmsKeyId=self.params.KmsKeyArn,
+        # Sessions (STS AssumeRole and boto3 setup) are not thread-safe, so resolve them
+        # here.  Only the copy requests run in the pool.
+        target_ec2s = {
+            target_account: self.__ec2_session(target_account).resource("ec2")
+            for target_account in target_accounts
+        }
+
+        with ThreadPoolExecutor(max_workers=len(target_accounts)) as executor:
+            copies = {
+                target_account: executor.submit(
+                    self.__copy_snapshot, target_ec2, snapshot_id
+                )
+                for target_account, target_ec2 in target_ec2s.items()
+            }
+
+        # Record every copy that started, so it is tracked even if another account failed
+        failed_accounts = []
+        for target_account, copy in copies.items():
+            try:
+                copied_snapshot_id = copy.result()
+            except Exception as e:
+                log.error(
+                    "Failed to copy snapshot {} to target account {} - {}",
+                    snapshot_id,
+                    target_account,
+                    e,
+                )
+                failed_accounts.append(target_account)
+                continue
+
+            log.debug(
+                "Copying snapshot {} to snapshot {} in target account {}",
+                snapshot_id,
+                copied_snapshot_id,
+                target_account,
+            )
+            self.set_state("SnapshotId{}".format(target_account), copied_snapshot_id)
+
+        if failed_accounts:
+            self.set_failed(
+                "Failed to copy snapshot {} to the target accounts {}".format(
+                    snapshot_id, ", ".join(failed_accounts)
+                )
+            )
+            return
+
+        log.trace("DuplicateImageToAccountAction._execute() completed")
+
+    def _check(self):
+
+        log.trace("DuplicateImageToAccountAction._check()")
+
+        pending_accounts = []
+        for target_account in self.params.AccountsToShare:
+            state = self.__check_account(target_account)
+            if state is None:
+                # The action has been set to failed
+                return
+            if state != "available":
+                pending_accounts.append(target_account)
+
+        if pending_accounts:
+            self.set_running(
+                "Waiting for images in the target accounts {}".format(
+                    ", ".join(pending_accounts)
+                )
+            )
+        else:
+            self.set_complete("Images are in state 'available'")
+
+        log.trace("Duplicate Image to Account Action check completed")
+
+    def _unexecute(self):
+        pass
+
+    def _cancel(self):
+        pass
+
+    def _resolve(self):
+
+        log.trace("DuplicateImageToAccountAction._resolve()")
+
+        self.params.Account = self.renderer.render_string(
+            self.params.Account, self.context
+        )
+        self.params.ImageName = self.renderer.render_string(
+            self.params.ImageName, self.context
         )
+        self.params.Region = self.renderer.render_string(
+            self.params.Region, self.context
+        )
+
+        log.trace("DuplicateImageToAccountAction._resolve() completed")
+
+    def __check_account(self, target_account: str) -> str | None:
+
+        log.trace("Checking duplicate image in target account {}", target_account)
 
-        copied_snapshot = target_ec2.Snapshot(copy["SnapshotId"])
-        copied_snapshot.wait_until_completed()
+        # Image was available and tagged on a previous check
+        if self.get_state("ImageState{}".format(target_account), None) == "available":
+            return "available"
+
+        target_ec2 = self.__ec2_session(target_account).resource("ec2")
+
+        image_id = self.get_state("ImageId{}".format(target_account), None)
+        if image_id is None:
+            return self.__check_snapshot(target_ec2, target_account)
+
+        log.debug("Checking availability of copied image {}", image_id)
+
+        ec2_client = target_ec2.meta.client
+        describe_images_response = ec2_client.describe_images(ImageIds=[image_id])
+
+        if len(describe_images_response["Images"]) == 0:
+            self.set_failed("No images found with id '{}'".format(image_id))
+            log.warning("No images found with id '{}'", image_id)
+            return None
+
+        state = describe_images_response["Images"][0]["State"]
+
+        if state == "available":
+            # Tag the image and its snapshots in a single call
+            image_snapshots = self.__get_image_snapshots(describe_images_response)
+            self.set_running(
+                "Tagging image '{}' and snapshots: {}".format(
+                    image_id, ", ".join(image_snapshots)
+                )
+            )
+            ec2_client.create_tags(
+                Resources=[image_id] + image_snapshots,
+                Tags=self.__tags,
+            )
+            self.set_state("ImageState{}".format(target_account), state)
+
+        elif state != "pending":
+            self.set_failed("Image is in state '{}'".format(state))
+            return None
+
+        return state
+
+    def __check_snapshot(self, target_ec2, target_account: str) -> str | None:
+
+        snapshot_id = self.get_state("SnapshotId{}".format(target_account), None)
+        if snapshot_id is None:
+            log.error(
+                "Internal error - state variable SnapshotId{} should have been set during action execution",
+                target_account,
+            )
+            self.set_failed(
+                "No snapshot previously copied to account {} - cannot continue".format(
+                    target_account
+                )
+            )
+            return None
+
+        copied_snapshot = target_ec2.Snapshot(snapshot_id)
 
         log.debug(
-            "Successfully copied from snapshot {} to snapshot {}",
+            "Snapshot {} in target account {} is in state '{}'",
             snapshot_id,
-            copied_snapshot.snapshot_id,
+            target_account,
+            copied_snapshot.state,
         )
 
+        if copied_snapshot.state == "error":
+            self.set_failed(
+                "Snapshot {} in target account {} is in state '{}'".format(
+                    snapshot_id, target_account, copied_snapshot.state
+                )
+            )
+            return None
+
+        if copied_snapshot.state != "completed":
+            return "pending"
+
         # Create AMI from snapshot in the target account
         self.set_running("Creating AMI in the target account {}".format(target_account))
 
@@ -205,84 +380,19 @@ class DuplicateImageToAccountAction(BaseAction):
 
         self.set_state("ImageId{}".format(target_account), r_image_id)
 
-        log.trace("DuplicateImageToAccountAction._execute() completed")
-
-    def _check(self):
-
-        log.trace("DuplicateImageToAccountAction._check()")
-
-        target_account = self.params.AccountsToShare
-        # Obtain an EC2 client
-        ec2_client = aws.ec2_client(
-            region=self.params.Region,
-            role=util.get_provisioning_role_arn(target_account),
-        )
-
-        # Wait for image creation to complete / fail
-        image_id = self.get_state("ImageId{}".format(target_account))
-        if image_id is None:
-            log.error(
-                "Internal error - state variable ImageId should have been set during action execution"
-            )
-            self.set_failed("No image previously created - cannot continue")
-            return
-
-        log.debug("Checking availability of copied image {}", image_id)
-
-        describe_images_response = ec2_client.describe_images(ImageIds=[image_id])
-
-        if len(describe_images_response["Images"]) == 0:
-            self.set_failed("No images found with id '{}'".format(image_id))
-            log.warning("No images found with id '{}'", image_id)
-            return
-
-        state = describe_images_response["Images"][0]["State"]
-
-        if state == "available":
-            self.set_running("Tagging image '{}'".format(image_id))
-            ec2_client.create_tags(
-                Resources=[image_id], Tags=aws.transform_tag_hash(self.params.Tags)
-            )
-
-            image_snapshots = self.__get_image_snapshots(describe_images_response)
-            self.set_running(
-                "Tagging image snapshots: {}".format(", ".join(image_snapshots))
-            )
-            if len(image_snapshots) > 0:
-                ec2_client.create_tags(
-                    Resources=image_snapshots,
-                    Tags=aws.transform_tag_hash(self.params.Tags),
-                )
-            self.set_complete("Image is in state '{}'".format(state))
-
-        elif state == "pending":
-            self.set_running("Image is in state '{}'".format(state))
-        else:
-            self.set_failed("Image is in state '{}'".format(state))
+        return "pending"
 
-        log.trace("Duplicate Image to Account Action check completed")
-
-    def _unexecute(self):
-        pass
-
-    def _cancel(self):
-        pass
-
-    def _resolve(self):
-
-        log.trace("DuplicateImageToAccountAction._resolve()")
+    def __copy_snapshot(self, target_ec2, snapshot_id: str) -> str:
 
-        self.params.Account = self.renderer.render_string(
-            self.params.Account, self.context
-        )
-        self.params.ImageName = self.renderer.render_string(
-            self.params.ImageName, self.context
-        )
-        self.params.Region = self.renderer.render_string(
-            self.params.Region, self.context
+        # Runs on a worker thread: no session setup or logging here
+        shared_snapshot = target_ec2.Snapshot(snapshot_id)
+        copy = shared_snapshot.copy(
+            SourceRegion=self.params.Region,
+            Encrypted=True,
+            KmsKeyId=self.params.KmsKeyArn,
         )
 
-        log.trace("DuplicateImageToAccountAction._resolve() completed")
+        return copy["SnapshotId"]
 
     def __get_image_snapshots(self, describe_images_response):
 
@@ -297,14 +407,31 @@ class DuplicateImageToAccountAction(BaseAction):
 
         return snapshots
 
-    def __ec2_session(self):
+    def __get_role_arn(self, account: str) -> str:
+
+        role_arn = self.__role_arns.get(account)
+        if role_arn is None:
+            role_arn = util.get_provisioning_role_arn(account)
+            self.__role_arns[account] = role_arn
+
+        return role_arn
+
+    def __ec2_session(self, target_account: str) -> boto3.Session:
 
         log.trace("DuplicateImageToAccountAction.__ec2_session()")
 
-        target_account = self.params.AccountsToShare
+        role_arn = self.__get_role_arn(target_account)
+        key = (role_arn, self.params.Region)
+
+        # Reuse the session (and its connection pool) until the credentials are about to expire
+        with _SESSION_CACHE_LOCK:
+            cached = _SESSION_CACHE.get(key)
+        if cached and time.time() + SESSION_EXPIRY_MARGIN < cached[0]:
+            log.trace("Using cached session on the target account {}", target_account)
+            return cached[1]
 
         credentials = aws.assume_role(
-            role=util.get_provisioning_role_arn(target_account),
+            role=role_arn,
             session_name="temp-session-{}".format(target_account),
         )
 
@@ -314,8 +441,18 @@ class DuplicateImageToAccountAction(BaseAction):
             aws_access_key_id=credentials["AccessKeyId"],
             aws_secret_access_key=credentials["SecretAccessKey"],
             aws_session_token=credentials["SessionToken"],
+            region_name=self.params.Region,
         )
 
+        expiration = credentials.get("Expiration")
+        if hasattr(expiration, "timestamp"):
+            expires_at = expiration.timestamp()
+        else:
+            expires_at = time.time() + SESSION_DEFAULT_LIFETIME
+
+        with _SESSION_CACHE_LOCK:
+            _SESSION_CACHE[key] = (expires_at, session)
+
         log.trace("Got session on the target account")
 
         return session
@@ -66,11 +66,10 @@ class SetVariablesAction(BaseAction):
 
         log.trace("SetVariablesAction._execute()")
 
-        for key, value in self.params.Variables.items():
-            self.set_output(key, value)
-            self.set_state(key, value)
+        # set_outputs() writes the state namespace as well as the output namespace
+        self.set_outputs(self.params.Variables)
 
-        self.set_complete()
+        self.set_complete("Variables have been set")
 
         log.trace("SetVariablesAction._execute() - complete")
 
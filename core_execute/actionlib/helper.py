@@ -64,7 +64,7 @@ class Helper:
                 # Can C run if:
                 # - action C after action A
                 # - action C after action B
-                if any(
+                if pending_action.depends_on(incomplete_action.label) or any(
                     self.__label_match(incomplete_action.label, dependency)
                     for dependency in pending_action.after
                 ):
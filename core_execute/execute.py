@@ -12,6 +12,7 @@ import core_logging as log
 from core_framework.models import TaskPayload, ActionDefinition
 from core_helper.magic import MagicS3Client
 
+from .actionlib.action import flush_status_updates
 from .actionlib.helper import Helper
 
 # When the lambda function is booted and the python module is loaded, we'll get a __bootup_time__
@@ -106,37 +107,43 @@ def __run_state_machine(action_helper: Helper) -> str:
 
 
 def run_state_machine(action_helper: Helper, context: Any | None) -> str:  # noqa: C901
-    failed = False
-
-    # Check if there are any failed actions
-    failed_actions = action_helper.failed_actions()
-    if len(failed_actions) > 0:
-        log.info("Found failed actions: {}", failed_actions)
-        failed = True
-
-    # Update the status of running actions
-    if failed is False:
-        for action in action_helper.running_actions():
-            if timeout_imminent(context):
-                break
-
-            # Check completion of action
-            action.check()
-            if action.is_failed():
-                failed = True
-                break
-
-    # Execute any runnable actions
-    if not failed:
-        for action in action_helper.runnable_actions():
-            if timeout_imminent(context):
-                break
-
-            # Execute the action
-            action.execute()
-            if action.is_failed():
-                failed = True
-                break
+    try:
+        failed = False
+
+        # Check if there are any failed actions
+        failed_actions = action_helper.failed_actions()
+        if len(failed_actions) > 0:
+            log.info("Found failed actions: {}", failed_actions)
+            failed = True
+
+        # Update the status of running actions
+        if failed is False:
+            for action in action_helper.running_actions():
+                if timeout_imminent(context):
+                    break
+
+                # Check completion of action
+                action.check()
+                if action.is_failed():
+                    failed = True
+                    break
+
+        # Execute any runnable actions
+        if not failed:
+            for action in action_helper.runnable_actions():
+                if timeout_imminent(context):
+                    break
+
+                # Execute the action
+                action.execute()
+                if action.is_failed():
+                    failed = True
+                    break
+
+    finally:
+        # Send the item status updates queued by the actions during this pass, even if it
+        # raised.  Otherwise they would be sent by a later invocation of a warm Lambda.
+        flush_status_updates()
 
     # Check for locked state
     if not failed:
@@ -0,0 +1,138 @@
+import warnings
+
+import pytest
+
+from core_framework.models import (
+    ActionDefinition,
+    ActionParams,
+    DeploymentDetails as DeploymentDetailsClass,
+)
+
+from core_execute.actionlib.action import BaseAction, compile_condition
+from core_execute.actionlib.actions.system.no_op import NoOpAction
+
+
+class RendererSpy:
+    """Stands in for the Jinja2 renderer and records the templates it is asked to render"""
+
+    def __init__(self, result: str = "Rendered"):
+        self.result = result
+        self.templates = []
+
+    def render_string(self, template, context):
+        self.templates.append(template)
+        return self.result
+
+
+@pytest.fixture
+def deployment_details():
+
+    return DeploymentDetailsClass(
+        Client="Client",
+        Portfolio="Portfolio",
+        Environment="Environment",
+        Scope="portfolio",
+        DataCenter="DataCenter",
+    )
+
+
+def make_action(condition: str, context: dict, deployment_details) -> NoOpAction:
+
+    definition = ActionDefinition(
+        Label="prn:portfolio:action/test-condition",
+        Type="SYSTEM::NoOp",
+        Condition=condition,
+        Params=ActionParams(),
+        Scope="build",
+    )
+
+    return NoOpAction(definition, context, deployment_details)
+
+
+def evaluate(action: BaseAction) -> str:
+    return action._BaseAction__evaluate_condition()
+
+
+@pytest.mark.parametrize(
+    "condition, context",
+    [
+        ("a and b", {"a": True, "b": False}),
+        ("a or b", {"a": False, "b": True}),
+        ("not a", {"a": False}),
+        ("a == 'prod' and not b", {"a": "prod", "b": False}),
+        ("1 < x < 10", {"x": 5}),
+        ("1 < x < 10", {"x": 10}),
+        ("x in ['a', 'b']", {"x": "b"}),
+        ("x not in ('a', 'b')", {"x": "c"}),
+        ("flag == true", {"flag": True}),
+        ("value == none", {"value": None}),
+        ("value != none or false", {"value": None}),
+    ],
+)
+def test_simple_condition_matches_jinja2(
+    condition, context, deployment_details, monkeypatch
+):
+
+    assert compile_condition(condition) is not None
+
+    expected = BaseAction.renderer.render_string("{{ " + condition + " }}", context)
+
+    action = make_action(condition, context, deployment_details)
+    spy = RendererSpy()
+    monkeypatch.setattr(action, "renderer", spy)
+
+    assert evaluate(action) == expected
+    assert spy.templates == []
+
+
+@pytest.mark.parametrize(
+    "condition, context",
+    [
+        # A name that is not in the context (Jinja2 decides how undefined behaves)
+        ("missing == 'a'", {"other": "a"}),
+        # A result that is not a bool
+        ("a or b", {"a": "", "b": "yes"}),
+        # An exception raised while evaluating
+        ("a < b", {"a": 1, "b": "text"}),
+    ],
+)
+def test_simple_condition_falls_back_to_jinja2(
+    condition, context, deployment_details, monkeypatch
+):
+
+    assert compile_condition(condition) is not None
+
+    action = make_action(condition, context, deployment_details)
+    spy = RendererSpy()
+    monkeypatch.setattr(action, "renderer", spy)
+
+    assert evaluate(action) == "Rendered"
+    assert spy.templates == ["{{ " + condition + " }}"]
+
+
+@pytest.mark.parametrize(
+    "condition",
+    [
+        "x | upper == 'A'",
+        "x is defined",
+        "x.y == 1",
+        "f(x)",
+        "x[0] == 1",
+        "x == 1 # note",
+        "r'a' == x",
+        "u'a' == x",
+        "1. == a",
+        ".5 == a",
+        "not " * 100000 + "x",
+    ],
+)
+def test_complex_condition_is_not_compiled(condition):
+
+    assert compile_condition(condition) is None
+
+
+def test_invalid_escape_does_not_warn():
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", SyntaxWarning)
+        assert compile_condition("x == '\\d'") is not None
@@ -0,0 +1,239 @@
+from types import SimpleNamespace
+
+import pytest
+
+from core_framework.models import (
+    ActionDefinition,
+    ActionParams,
+    DeploymentDetails as DeploymentDetailsClass,
+)
+
+import core_execute.actionlib.actions.aws.duplicate_image_to_account as module
+from core_execute.actionlib.actions.aws.duplicate_image_to_account import (
+    DuplicateImageToAccountAction,
+)
+
+SOURCE_SNAPSHOT = "snap-source"
+
+
+class FakeSnapshot:
+    """Stands in for the boto3 EC2 Snapshot resource"""
+
+    def __init__(self, ec2: "FakeTargetEC2", snapshot_id: str):
+        self.ec2 = ec2
+        self.snapshot_id = snapshot_id
+        self.volume_size = 8
+
+    @property
+    def state(self):
+        return self.ec2.snapshot_state
+
+    def copy(self, **kwargs):
+        if self.ec2.copy_error:
+            raise self.ec2.copy_error
+        self.ec2.copies.append((self.snapshot_id, kwargs))
+        return {"SnapshotId": f"snap-{self.ec2.account}"}
+
+
+class FakeTargetClient:
+    """Stands in for the EC2 client of a target account"""
+
+    def __init__(self, ec2: "FakeTargetEC2"):
+        self.ec2 = ec2
+        self.tags = []
+
+    def describe_images(self, ImageIds):
+        return {
+            "Images": [
+                {
+                    "ImageId": image_id,
+                    "State": self.ec2.image_state,
+                    "BlockDeviceMappings": [
+                        {"Ebs": {"SnapshotId": f"snap-ami-{self.ec2.account}"}}
+                    ],
+                }
+                for image_id in ImageIds
+            ]
+        }
+
+    def create_tags(self, Resources, Tags):
+        self.tags.append(Resources)
+
+
+class FakeTargetEC2:
+    """Stands in for the boto3 EC2 resource of a target account"""
+
+    def __init__(self, account: str):
+        self.account = account
+        self.copy_error = None
+        self.copies = []
+        self.snapshot_state = "pending"
+        self.image_state = "pending"
+        self.registered = []
+        self.meta = SimpleNamespace(client=FakeTargetClient(self))
+
+    def Snapshot(self, snapshot_id):
+        return FakeSnapshot(self, snapshot_id)
+
+    def register_image(self, **kwargs):
+        self.registered.append(kwargs)
+        return SimpleNamespace(id=f"ami-{self.account}")
+
+
+class FakeSourceClient:
+    """Stands in for the EC2 client of the source account"""
+
+    def __init__(self):
+        self.shared_with = []
+
+    def describe_images(self, Filters):
+        return {
+            "Images": [
+                {
+                    "ImageId": "ami-source",
+                    "BlockDeviceMappings": [{"Ebs": {"SnapshotId": SOURCE_SNAPSHOT}}],
+                }
+            ]
+        }
+
+    def modify_snapshot_attribute(self, **kwargs):
+        self.shared_with.extend(kwargs["UserIds"])
+
+
+@pytest.fixture
+def targets():
+    return {
+        account: FakeTargetEC2(account) for account in ("111111111111", "222222222222")
+    }
+
+
+@pytest.fixture
+def source_client(monkeypatch):
+
+    client = FakeSourceClient()
+    monkeypatch.setattr(module.aws, "ec2_client", lambda **kwargs: client)
+    monkeypatch.setattr(
+        module.util, "get_provisioning_role_arn", lambda account: f"arn:{account}"
+    )
+    return client
+
+
+@pytest.fixture
+def action(targets, source_client, monkeypatch):
+
+    def ec2_session(self, target_account):
+        return SimpleNamespace(resource=lambda name: targets[target_account])
+
+    monkeypatch.setattr(
+        DuplicateImageToAccountAction,
+        "_DuplicateImageToAccountAction__ec2_session",
+        ec2_session,
+    )
+
+    definition = ActionDefinition(
+        Label="prn:portfolio:action/duplicate-image",
+        Type="AWS::DuplicateImageToAccount",
+        Params=ActionParams(
+            Account="154798051514",
+            Region="ap-southeast-1",
+            ImageName="my-image-name",
+            AccountsToShare=list(targets),
+            KmsKeyArn="arn:aws:kms:ap-southeast-1:154798051514:key/key-id",
+            Tags={"From": "John Smith"},
+        ),
+        Scope="build",
+    )
+
+    deployment_details = DeploymentDetailsClass(
+        Client="Client",
+        Portfolio="Portfolio",
+        Environment="Environment",
+        Scope="portfolio",
+        DataCenter="DataCenter",
+    )
+
+    return DuplicateImageToAccountAction(definition, {}, deployment_details)
+
+
+def reason(action) -> str:
+    return action.context[action._status_reason_key]
+
+
+def test_partial_copy_failure(action, targets, source_client):
+
+    targets["222222222222"].copy_error = RuntimeError("AccessDenied")
+
+    action._execute()
+
+    assert source_client.shared_with == list(targets)
+
+    # The copy that started is still tracked
+    assert action.get_state("SnapshotId111111111111") == "snap-111111111111"
+    assert action.get_state("SnapshotId222222222222", None) is None
+
+    assert action.is_failed()
+    assert "222222222222" in reason(action)
+    assert "111111111111" not in reason(action)
+
+
+def test_snapshot_in_error_state(action, targets):
+
+    action._execute()
+    assert not action.is_failed()
+
+    targets["222222222222"].snapshot_state = "error"
+
+    action._check()
+
+    assert action.is_failed()
+    assert "snap-222222222222" in reason(action)
+    assert "222222222222" in reason(action)
+
+
+def test_images_are_registered_tagged_and_completed(action, targets):
+
+    action._execute()
+
+    for account, ec2 in targets.items():
+        assert ec2.copies == [
+            (
+                SOURCE_SNAPSHOT,
+                {
+                    "SourceRegion": "ap-southeast-1",
+                    "Encrypted": True,
+                    "KmsKeyId": "arn:aws:kms:ap-southeast-1:154798051514:key/key-id",
+                },
+            )
+        ]
+        assert action.get_state(f"SnapshotId{account}") == f"snap-{account}"
+
+    # Snapshot copies still pending
+    action._check()
+    assert action.is_running()
+    assert all(not ec2.registered for ec2 in targets.values())
+
+    # Snapshots completed: an AMI is registered in each account
+    for ec2 in targets.values():
+        ec2.snapshot_state = "completed"
+    action._check()
+    assert action.is_running()
+    for account, ec2 in targets.items():
+        assert len(ec2.registered) == 1
+        assert action.get_state(f"ImageId{account}") == f"ami-{account}"
+
+    # Only the first image is available yet
+    targets["111111111111"].image_state = "available"
+    action._check()
+    assert action.is_running()
+    assert "222222222222" in reason(action)
+    assert "111111111111" not in reason(action)
+
+    # Both available: the action completes, and each image is tagged once
+    targets["222222222222"].image_state = "available"
+    action._check()
+    assert action.is_complete()
+
+    for account, ec2 in targets.items():
+        assert len(ec2.registered) == 1
+        assert ec2.meta.client.tags == [[f"ami-{account}", f"snap-ami-{account}"]]
+        assert action.get_state(f"ImageState{account}") == "available"
@@ -0,0 +1,114 @@
+import pytest
+
+import core_execute.actionlib.action as action_module
+from core_execute.actionlib.action import StatusUpdateBatcher
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Record the database calls made by the batcher instead of sending them"""
+
+    calls = []
+
+    def update_status(**kwargs):
+        calls.append(("status", kwargs))
+
+    def update_item(**kwargs):
+        calls.append(("item", kwargs))
+
+    monkeypatch.setattr(action_module, "update_status", update_status)
+    monkeypatch.setattr(action_module, "update_item", update_item)
+
+    return calls
+
+
+def test_status_updates_are_coalesced_per_prn(calls):
+
+    batcher = StatusUpdateBatcher()
+
+    batcher.add_status("prn:a", "RUNNING", "first", {"step": 1})
+    batcher.add_status("prn:a", "COMPLETE", "second")
+    batcher.add_status("prn:b", "RUNNING")
+
+    assert calls == []
+
+    batcher.flush()
+
+    assert calls == [
+        ("status", {"prn": "prn:a", "status": "COMPLETE", "message": "second"}),
+        ("status", {"prn": "prn:b", "status": "RUNNING"}),
+    ]
+
+
+def test_item_updates_are_merged(calls):
+
+    batcher = StatusUpdateBatcher()
+
+    batcher.add_item("prn:branch", released_build_prn="prn:build:1")
+    batcher.add_item("prn:branch", name="branch")
+
+    batcher.flush()
+
+    assert calls == [
+        (
+            "item",
+            {
+                "prn": "prn:branch",
+                "released_build_prn": "prn:build:1",
+                "name": "branch",
+            },
+        ),
+    ]
+
+
+def test_build_status_is_sent_before_branch_pointer(calls):
+
+    batcher = StatusUpdateBatcher()
+
+    # A release queues the build status and then the branch pointer
+    batcher.add_status("prn:build", "RELEASE_IN_PROGRESS", "releasing")
+    batcher.add_item("prn:branch", released_build_prn="prn:build")
+
+    # A later status for the same build must not be sent after the pointer
+    batcher.add_status("prn:build", "RELEASE_FAILED")
+
+    batcher.flush()
+
+    assert calls == [
+        ("status", {"prn": "prn:build", "status": "RELEASE_FAILED"}),
+        ("item", {"prn": "prn:branch", "released_build_prn": "prn:build"}),
+    ]
+
+
+def test_flush_when_full(calls):
+
+    batcher = StatusUpdateBatcher(max_pending=2)
+
+    batcher.add_status("prn:a", "RUNNING")
+    assert calls == []
+
+    batcher.add_status("prn:b", "RUNNING")
+    assert [kwargs["prn"] for _, kwargs in calls] == ["prn:a", "prn:b"]
+
+    # The buffer is empty after a flush
+    calls.clear()
+    batcher.flush()
+    assert calls == []
+
+
+def test_flush_continues_after_a_failed_update(calls, monkeypatch):
+
+    def update_status(**kwargs):
+        if kwargs["prn"] == "prn:a":
+            raise RuntimeError("API unavailable")
+        calls.append(("status", kwargs))
+
+    monkeypatch.setattr(action_module, "update_status", update_status)
+
+    batcher = StatusUpdateBatcher()
+    batcher.add_status("prn:a", "RUNNING")
+    batcher.add_status("prn:b", "RUNNING")
+
+    batcher.flush()
+
+    assert calls == [("status", {"prn": "prn:b", "status": "RUNNING"})]